@@ -1,19 +1,46 @@
 """Convert OWL to FHIR"""
+import atexit
+import csv
+import fcntl
+import hashlib
 import json
 import os
+import re
+import shlex
 import shutil
+import ssl
 import subprocess
+import threading
+import time
 from argparse import ArgumentParser
-from pathlib import PosixPath
-from typing import Dict, List, Union
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from functools import lru_cache
+from pathlib import Path, PosixPath
+from typing import Dict, List, Tuple, Union
 
 import curies
+import ijson
 import requests
+import urllib3
+import zstandard
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from linkml_runtime.dumpers import json_dumper
 from linkml_runtime.loaders import json_loader
 from oaklib.converters.obo_graph_to_fhir_converter import OboGraphToFHIRConverter
-from oaklib.datamodels.obograph import GraphDocument
+from oaklib.datamodels.fhir import CodeSystem, CodeSystemProperty
+from oaklib.datamodels.obograph import Edge, GraphDocument, Node
 from oaklib.interfaces.basic_ontology_interface import get_default_prefix_map
-from urllib.parse import urlparse
+from oaklib.selector import get_adapter
+
+try:
+    import jpype
+except ImportError:
+    jpype = None
 
 
 # Vars
@@ -23,27 +50,224 @@ BIN_DIR = SRC_DIR
 PROJECT_DIR = os.path.join(SRC_DIR, '..')
 CACHE_DIR = os.path.join(PROJECT_DIR, 'cache')
 ROBOT_PATH = os.path.join(BIN_DIR, 'robot.jar')
+JAVA_PATH = shutil.which('java') or 'java'  # Resolved once, rather than a PATH search per ROBOT call
+# Default ROBOT JVM flags. Obographs repeat the same IRIs a lot, which string deduplication (G1 only) collapses.
+ROBOT_JVM_FLAGS = ['-XX:+UseG1GC', '-XX:+UseStringDeduplication']
+ROBOT_MAX_RAM_PERCENTAGE = 75  # Max heap, as % of RAM or the container's limit, split between concurrent jobs' JVMs
+ODK_IMAGE = 'obolibrary/odkfull:dev'
+ODK_CONTAINER_PREFIX = 'owl_on_fhir_odk'
+ODK_RUN_LABEL = 'owl_on_fhir.run'  # Docker label on the ODK containers a run starts, so that it can remove them after
+ODK_CONFLICT_TIMEOUT = 30  # Seconds to wait for a container another process is starting under the same name
 INTERMEDIARY_TYPES = ['obographs', 'semsql']
+CACHE_ZSTD_LEVEL = 9  # Cached intermediaries are written once and read many times, so favor ratio over write speed
+URL_PREFIXES = ('http://', 'https://')  # Inputs starting with these are downloaded; others are local paths
+# Default CodeSystem ID derivation: the input's name minus its extension(s), or the ID in an out filename
+INPUT_EXTENSION_RE = re.compile(r'\.(?:obographs?\.json|[^.]+)$')
+CODE_SYSTEM_FILENAME_RE = re.compile(r'CodeSystem-(?P<id>.+)\.json')
+# - Vars: HTTP
+HTTP_ADAPTER_KWARGS = {'pool_connections': 4, 'pool_maxsize': 16, 'max_retries': Retry(total=3, backoff_factor=0.3)}
+# Shared so that connections (and their TLS handshakes) are reused across downloads
+_SESSION = requests.Session()
+for _scheme in ('http://', 'https://'):
+    _SESSION.mount(_scheme, HTTPAdapter(**HTTP_ADAPTER_KWARGS))
+# Per-ontology fields of a --manifest. Other owl_to_fhir() params come from the CLI and are shared by all entries.
+MANIFEST_FIELDS = ['input_path_or_url', 'code_system_id', 'code_system_url', 'native_uri_stems']
+# - Vars: Subprocesses
+OUTPUT_TAIL_LINES = 1000  # Lines of each of stdout/stderr that _run_shell_command() keeps, e.g. for error messages
+# `make` output meaning nothing was built. "up to date" is raised as FileExistsError; see: owl_to_semsql()
+MAKE_NO_OP_RE = re.compile(rb"make: Nothing to be done|(?P<up_to_date>\.db' is up to date)")
+# ID of this run, for ODK_RUN_LABEL. Batch workers are given their parent's, so that the parent can remove theirs.
+_ODK_RUN_ID = str(os.getpid())
+_CONCURRENT_JOBS = 1  # Conversions running at once, each with its own ROBOT JVM. Set in batch workers.
+_IN_BATCH_WORKER = False  # Batch workers leave cleanup of files shared between jobs to owl_to_fhir_batch()
+# - Vars: RXNORM preprocessing
+# Each pattern replaces its first match per line. The umls:cui substitution appears twice to replace up to 2 per line.
+# See: https://github.com/INCATools/semantic-sql/blob/main/utils/ncbo2owl.pl
+RXNORM_SUBSTITUTIONS = [(re.compile(pattern), replacement) for pattern, replacement in [
+    (rb'skos:prefLabel ', rb'rdfs:label '),
+    (rb'<http://purl.bioontology.org/ontology/\w+/isa> ', rb'rdfs:subClassOf '),
+    (rb'umls:cui """(\w+)"""\^\^xsd:string', rb'skos:exactMatch umls:\1'),
+    (rb'umls:cui """(\w+)"""\^\^xsd:string', rb'skos:exactMatch umls:\1'),
+    (rb'(<http://purl.bioontology.org/ontology/RXNORM/(has_ingredient|consists_of|has_dose_form|tradename_of)>) '
+     rb'(<http://purl.bioontology.org/ontology/RXNORM/\d+>)',
+     rb'rdfs:subClassOf [a owl:Restriction; owl:onProperty \1; owl:someValuesFrom \3]'),
+]]
+
+
+# Classes
+@dataclass(frozen=True)
+class Config:
+    """Settings for an owl_to_fhir() run
+    Fields above "Derived" are owl_to_fhir()'s params. The rest are derived from those in __post_init__(), so that the
+    rest of the run doesn't need to work out e.g. code_system_id from out_filename or vice versa."""
+    input_path_or_url: Union[str, PosixPath]
+    out_dir: str = None
+    out_filename: str = None
+    include_only_critical_predicates: bool = False
+    retain_intermediaries: bool = False
+    intermediary_type: str = INTERMEDIARY_TYPES[0]
+    use_cached_intermediaries: bool = False
+    intermediary_outdir: str = None
+    convert_intermediaries_only: bool = False
+    native_uri_stems: List[str] = None
+    code_system_id: str = None
+    code_system_url: str = None
+    dev_oak_path: str = None
+    dev_oak_interpreter_path: str = None
+    rxnorm_bioportal: bool = False
+    keep_odk_container: bool = False
+    insecure: bool = False
+    # Derived
+    url: str = field(init=False)
+    input_path: str = field(init=False)
+    include_all_predicates: bool = field(init=False)
+
+    # todo: this has too many possible branches w/ urls, names, and IDs and is error prone. simplify by updating CLI
+    #  params to require url or path separately, and maybe require codesystem id
+    def __post_init__(self):
+        """Derive the remaining settings. If input is a URL, input_path is where it will be downloaded to."""
+        input_path_or_url = str(self.input_path_or_url)
+        url = None
+        out_dir = Path(self.out_dir if self.out_dir else os.getcwd()).expanduser().resolve()
+        out_filename = self.out_filename
+        code_system_id = self.code_system_id
+        if input_path_or_url.lower().startswith(URL_PREFIXES):
+            url = input_path_or_url
+        if not out_filename:
+            if not code_system_id:
+                if url:
+                    raise ValueError(f'Input is a URL, so code_system_id or out_filename is needed: {url}')
+                code_system_id = INPUT_EXTENSION_RE.sub('', Path(input_path_or_url).name, count=1)
+            out_filename = f'CodeSystem-{code_system_id}.json'
+        # A URL is downloaded to a path named after the output, so that several URL inputs don't overwrite each other
+        input_path = out_dir / Path(out_filename).with_suffix('.owl') if url else Path(input_path_or_url).expanduser()
+        if not code_system_id and out_filename:
+            out_filename_match = CODE_SYSTEM_FILENAME_RE.fullmatch(out_filename)
+            code_system_id = out_filename_match['id'] if out_filename_match else None
+        derived = {
+            'input_path_or_url': input_path_or_url,
+            'url': url,
+            'input_path': str(input_path),
+            'out_dir': str(out_dir),
+            'out_filename': out_filename,
+            'code_system_id': code_system_id,
+            'intermediary_outdir':
+                str(Path(self.intermediary_outdir).expanduser()) if self.intermediary_outdir else str(out_dir),
+            'include_all_predicates': not self.include_only_critical_predicates,
+        }
+        for k, v in derived.items():
+            object.__setattr__(self, k, v)  # frozen=True blocks normal assignment
 
 
 # Functions
-def _run_shell_command(command: str, cwd_outdir: str = None) -> subprocess.CompletedProcess:
-    """Runs a command in the shell, and handles some common errors"""
-    args = command.split(' ')
-    if cwd_outdir:
-        result = subprocess.run(args, capture_output=True, text=True, cwd=cwd_outdir)
-    else:
-        result = subprocess.run(args, capture_output=True, text=True)
-    stderr, stdout = result.stderr, result.stdout
-    if stderr and 'Unable to create a system terminal, creating a dumb terminal' not in stderr:
-        raise RuntimeError(stderr)
-    elif stdout and 'error' in stdout or 'ERROR' in stdout:
-        raise RuntimeError(stdout)
-    elif stdout and 'make: Nothing to be done' in stdout:
-        raise RuntimeError(stdout)
-    elif stdout and ".db' is up to date" in stdout:
-        raise FileExistsError(stdout)
-    return result
+def _run_shell_command(args: Union[str, List[str]], cwd_outdir: str = None) -> subprocess.CompletedProcess:
+    """Runs a command, and handles some common errors
+    Prefer passing the command as a list of arguments, so that paths with spaces etc. are passed through intact. A
+    string is split shell-style (shlex), so quoted paths work there too. Output is checked line by line as it arrives,
+    and only the last OUTPUT_TAIL_LINES lines of stdout and stderr are kept, so that verbose tools (e.g. ROBOT on a
+    large ontology) don't pile up their whole log in memory. Output is read as bytes, and only those tails are
+    decoded."""
+    if isinstance(args, str):
+        args = shlex.split(args)
+    stdout_tail, stderr_tail = deque(maxlen=OUTPUT_TAIL_LINES), deque(maxlen=OUTPUT_TAIL_LINES)
+    make_no_op = None
+    with subprocess.Popen(
+        args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=1 << 16, cwd=cwd_outdir
+    ) as proc:
+        # Drain stderr concurrently, else the process can block on a full stderr pipe while we wait on stdout
+        stderr_reader = threading.Thread(target=stderr_tail.extend, args=(proc.stderr,), daemon=True)
+        stderr_reader.start()
+        for line in proc.stdout:
+            stdout_tail.append(line)
+            make_no_op = make_no_op or MAKE_NO_OP_RE.search(line)
+        stderr_reader.join()
+    stdout, stderr = (b''.join(tail).decode(errors='replace') for tail in (stdout_tail, stderr_tail))
+    if proc.returncode != 0:
+        raise RuntimeError(stderr or stdout)
+    if make_no_op:
+        raise FileExistsError(stdout) if make_no_op['up_to_date'] else RuntimeError(stdout)
+    return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+
+def _ensure_cache_dirs(out_dir: str, intermediary_outdir: str):
+    """Create the cache and output dirs for a run, if they don't exist. Safe if several runs do this at once."""
+    for _dir in (CACHE_DIR, out_dir, intermediary_outdir):
+        os.makedirs(_dir, exist_ok=True)
+
+
+@lru_cache(maxsize=1)
+def _curie_converter() -> curies.Converter:
+    """Converter for OAK's default prefix map. It is pure data, so it is only built once per process."""
+    return curies.Converter.from_prefix_map(get_default_prefix_map())
+
+
+@lru_cache(maxsize=1)
+def _fhir_converter() -> OboGraphToFHIRConverter:
+    """OboGraph to FHIR converter using OAK's default prefix map
+    Reused across conversions. The only state it keeps between calls (the predicates to export) is reset at the start
+    of each graph."""
+    converter = OboGraphToFHIRConverter()
+    converter.curie_converter = _curie_converter()
+    return converter
+
+
+@lru_cache(maxsize=1)
+def _robot_jvm_args() -> Tuple[str, ...]:
+    """JVM args for ROBOT
+    If the ROBOT_JAVA_ARGS env var is set (the same one ROBOT's own launcher script reads), it is used as is. Otherwise,
+    ROBOT_JVM_FLAGS, plus a max heap of this process's share of ROBOT_MAX_RAM_PERCENTAGE, since the JVM's default of
+    1/4 of memory is too little for large ontologies. It is set as a percentage rather than -Xmx, so that the JVM
+    applies it to the container's memory limit where there is one, rather than to the host's memory."""
+    if os.environ.get('ROBOT_JAVA_ARGS'):
+        return tuple(shlex.split(os.environ['ROBOT_JAVA_ARGS']))
+    return (f'-XX:MaxRAMPercentage={ROBOT_MAX_RAM_PERCENTAGE / _CONCURRENT_JOBS:g}', *ROBOT_JVM_FLAGS)
+
+
+def _robot_cli():
+    """Get ROBOT's CommandLineInterface from a JVM that is started once and then kept warm for the rest of the process
+
+    Returns None if JPype is not installed, in which case ROBOT should be run as a subprocess instead."""
+    if jpype is None:
+        return None
+    if not jpype.isJVMStarted():
+        jpype.startJVM(*_robot_jvm_args(), classpath=[ROBOT_PATH])
+    return jpype.JClass('org.obolibrary.robot.CommandLineInterface')
+
+
+def _run_robot(args: List[str]):
+    """Runs a ROBOT command
+    Runs in-process on a persistent JVM if JPype is available, so that converting several ontologies in one run only
+    pays JVM startup once. Otherwise falls back to `java -jar robot.jar` per call."""
+    robot_cli = _robot_cli()
+    if robot_cli is None:
+        return _run_shell_command([JAVA_PATH, *_robot_jvm_args(), '-jar', ROBOT_PATH] + args)
+    try:
+        robot_cli.execute(jpype.JArray(jpype.JString)(args))
+    except jpype.JException as e:
+        raise RuntimeError(str(e))
+
+
+def _warm_robot():
+    """Run ROBOT once so that java and robot.jar are in the OS page cache when the real conversion starts
+    Best effort: meant to be run in the background, e.g. during a download, so failures are ignored."""
+    try:
+        _run_shell_command([JAVA_PATH, *_robot_jvm_args(), '-jar', ROBOT_PATH, '--version'])
+    except (RuntimeError, OSError):
+        pass
+
+
+def _pull_odk_image():
+    """Pull the ODK docker image if it is not present yet
+    Best effort: meant to be run in the background, e.g. during a download, so failures are ignored."""
+    try:
+        _run_shell_command(['docker', 'image', 'inspect', ODK_IMAGE])
+    except RuntimeError:
+        try:
+            _run_shell_command(['docker', 'pull', ODK_IMAGE])
+        except (RuntimeError, OSError):
+            pass
+    except OSError:
+        pass
 
 
 def _preprocess_rxnorm(path: str) -> str:
@@ -57,82 +281,287 @@ def _preprocess_rxnorm(path: str) -> str:
         return path
     print('INFO: RXNORM.ttl from Bioportal detected. Doing some preprocessing.')
     outpath = path.replace(".ttl", "-fixed.ttl")
-    _run_shell_command(f'cp {path} {outpath}')
-    command_str = f'perl -i {os.path.join(BIN_DIR, "convert_owl_ncbo2owl.pl")} {outpath}'
-    _run_shell_command(command_str)
+    tmp_path = outpath + '.tmp'
+    with open(path, 'rb', buffering=1024 * 1024) as f_in, open(tmp_path, 'wb', buffering=1024 * 1024) as f_out:
+        for line in f_in:
+            for pattern, replacement in RXNORM_SUBSTITUTIONS:
+                line = pattern.sub(replacement, line, count=1)
+            f_out.write(line)
+    os.replace(tmp_path, outpath)
     return outpath
 
 
-def download(url: str, path: str, save_to_cache=False, download_if_cached=True):
+class _UnverifiedTLSAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools all share one SSLContext that doesn't verify certificates"""
+    def __init__(self, ssl_context: ssl.SSLContext, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Pass the shared SSLContext to the pool manager"""
+        kwargs['ssl_context'] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+
+@lru_cache(maxsize=1)
+def _insecure_session() -> requests.Session:
+    """Session for --insecure downloads. Built on first use only, so that secure runs don't get warnings disabled."""
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    # urllib3 would warn on every request; warn once instead
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    print('Warning: --insecure: TLS certificates of download servers will not be verified.')
+    session = requests.Session()
+    session.mount('https://', _UnverifiedTLSAdapter(ssl_context, **HTTP_ADAPTER_KWARGS))
+    session.mount('http://', HTTPAdapter(**HTTP_ADAPTER_KWARGS))
+    return session
+
+
+def download(url: str, path: str, save_to_cache=False, download_if_cached=True, insecure=False):
     """Download file at url to local path
+    Streams the response to disk in 1 MiB chunks, so memory use does not grow with the size of the file. The file only
+    appears at `path` once the download completes.
 
-    :param download_if_cached: If True and file at `path` already exists, download anyway."""
+    :param download_if_cached: If True and file at `path` already exists, download anyway. The ETag / Last-Modified
+     from the previous download, if the server sent them, are used to skip the download if the file has not changed.
+     Without those, the file's modification time is used as If-Modified-Since.
+    :param insecure: If True, don't verify the server's TLS certificate."""
     _dir = os.path.dirname(path)
-    if not os.path.exists(_dir):
-        os.makedirs(_dir)
+    os.makedirs(_dir, exist_ok=True)
     if download_if_cached or not os.path.exists(path):
-        with open(path, 'wb') as f:
-            response = requests.get(url, verify=False)
-            f.write(response.content)
+        meta_path = path + '.meta.json'
+        headers = {}
+        if os.path.exists(path) and os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta: Dict[str, str] = json.load(f)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        elif os.path.exists(path):
+            headers['If-Modified-Since'] = formatdate(os.path.getmtime(path), usegmt=True)
+        session = _insecure_session() if insecure else _SESSION
+        # verify=False still needs to be passed per request; a Session.verify of False loses to REQUESTS_CA_BUNDLE etc.
+        with session.get(url, headers=headers, stream=True, verify=not insecure, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            if response.status_code != 304:  # 304: Not Modified
+                response.raw.decode_content = True  # Undo any Content-Encoding, e.g. gzip, as iter_content() would
+                # Into a temp file first: a truncated file at `path` would otherwise look up to date next time
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb', buffering=1024 * 1024) as f:
+                    shutil.copyfileobj(response.raw, f, 1024 * 1024)
+                os.replace(tmp_path, path)
+                meta = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+                if any(meta.values()):
+                    with open(meta_path, 'w') as f:
+                        json.dump(meta, f)
+                elif os.path.exists(meta_path):
+                    os.remove(meta_path)
     if save_to_cache:
         cache_path = os.path.join(CACHE_DIR, os.path.basename(path))
         shutil.copy(path, cache_path)
 
 
+def _odk_container_running(name: str) -> Union[bool, None]:
+    """Whether the named container is running. None if there is no such container."""
+    try:
+        return _run_shell_command(['docker', 'inspect', '-f', '{{.State.Running}}', name]).stdout.strip() == 'true'
+    except RuntimeError:
+        return None
+
+
+def _odk_container(mount_dir: str, keep_container=False) -> str:
+    """Get the name of a running ODK container that has `mount_dir` mounted at /work, starting one if needed
+    Container startup costs far more than the `semsql make` we run in it, so containers are reused across conversions.
+    There is one container per mount dir, since a bind mount can't be changed once the container is running. Several
+    processes, e.g. batch workers, may ask for the same one at once: if another starts it first, we wait for that one.
+
+    :param keep_container: If False and this call starts the container, it is labeled with this run's ID, so that
+     it is removed at the end of the run. See: _remove_odk_containers()"""
+    name = f'{ODK_CONTAINER_PREFIX}_{hashlib.md5(mount_dir.encode()).hexdigest()[:8]}'
+    running = _odk_container_running(name)
+    if running:
+        return name
+    if running is False:
+        _run_shell_command(['docker', 'start', name])
+        return name
+    label = [] if keep_container else ['--label', f'{ODK_RUN_LABEL}={_ODK_RUN_ID}']
+    try:
+        _run_shell_command([
+            'docker', 'run', '-d', *label, '-w', '/work', '-v', f'{mount_dir}:/work', '--name', name, ODK_IMAGE,
+            'sleep', 'infinity'])
+    except RuntimeError as e:
+        if 'Conflict' not in str(e):
+            raise
+        # Another process created a container of this name since we inspected: use that one once it's up
+        deadline = time.monotonic() + ODK_CONFLICT_TIMEOUT
+        while not _odk_container_running(name):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+        return name
+    if not keep_container:
+        _register_odk_cleanup()
+    return name
+
+
+@lru_cache(maxsize=1)
+def _register_odk_cleanup():
+    """Remove this run's ODK containers when the process exits. Registered once, on the first container started.
+    Batch workers' exit handlers don't run, so owl_to_fhir_batch() does this itself. See: owl_to_fhir_batch()"""
+    atexit.register(_remove_odk_containers)
+
+
+def _remove_odk_containers():
+    """Remove the ODK containers started by this run, i.e. those labeled with its ID
+    Best effort, since it runs at the end of a run, e.g. where Docker may not even be installed, so failures are
+    ignored."""
+    try:
+        ids = _run_shell_command(
+            ['docker', 'ps', '-aq', '--filter', f'label={ODK_RUN_LABEL}={_ODK_RUN_ID}']).stdout.split()
+        if ids:
+            _run_shell_command(['docker', 'rm', '-f', *ids])
+    except (RuntimeError, OSError):
+        pass
+
+
+@contextmanager
+def _dir_lock(_dir: str):
+    """Hold an exclusive lock on a dir, shared with other processes, e.g. batch workers, for as long as the block runs
+    For `semsql make`, which builds and uses a .template.db in the dir, so two makes in one dir can't run at once."""
+    with open(os.path.join(_dir, '.owl_on_fhir.lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)  # Released when the file is closed
+        yield
+
+
 # todo: owl_to_semsql: this may need similar updates to caching that were done for obographs on 2023/04/15
-def owl_to_semsql(inpath: str, use_cache=False) -> str:
+def owl_to_semsql(inpath: str, use_cache=False, keep_container=False) -> str:
     """Converts OWL (or RDF, I think) to a SemanticSQL sqlite DB.
     Docs: https://incatools.github.io/ontology-access-kit/intro/tutorial07.html?highlight=semsql
-    - Had to change "--rm -ti"  --> "--rm"
+    - Runs `semsql make` via `docker exec` in a reused container. See: _odk_container()
+    - Only one `semsql make` runs in a dir at a time. See: _dir_lock()
     todo: consider using linkml/semantic-sql image which is more up-to-date instead
       https://github.com/INCATools/semantic-sql
       docker run  -v $PWD:/work -w /work -ti linkml/semantic-sql semsql make foo.db
     todo: RDF also supported? not just OWL? (TTL not supported)
     """
     # Vars
-    _dir = os.path.dirname(inpath)
-    output_filename = os.path.basename(inpath).replace('.owl', '.db').replace('.rdf', '.db').replace('.ttl', '.db')
-    outpath = os.path.join(_dir, output_filename)
-    command_str = f'docker run -w /work -v {_dir}:/work --rm obolibrary/odkfull:dev semsql make {output_filename}'
+    outpath = Path(inpath).with_suffix('.db')
+    _dir = str(outpath.parent)
 
     # Convert
-    if use_cache and os.path.exists(outpath):
-        return outpath
-    try:
-        _run_shell_command(command_str, cwd_outdir=_dir)
-    except FileExistsError:
-        if not use_cache:
-            os.remove(outpath)
-            _run_shell_command(command_str, cwd_outdir=_dir)
-    return outpath
+    if use_cache and outpath.exists():
+        return str(outpath)
+    container = _odk_container(_dir, keep_container)
+    command = ['docker', 'exec', '-w', '/work', container, 'semsql', 'make', outpath.name]
+    with _dir_lock(_dir):
+        try:
+            _run_shell_command(command, cwd_outdir=_dir)
+        except FileExistsError:
+            if not use_cache:
+                os.remove(outpath)
+                _run_shell_command(command, cwd_outdir=_dir)
+    return str(outpath)
+
+
+def _file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file, read in 1 MiB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 def owl_to_obograph(inpath: str, out_dir: str, use_cache=False, cache_output=False) -> str:
     """Convert OWL to Obograph
+    The cache is keyed by the input's content hash, so a changed input with the same name isn't served stale output, and
+    an unchanged one is a hit wherever it was downloaded to. On a hit, the cached output is copied to `out_dir`, so
+    that removing the intermediary afterwards leaves the cache intact. Cached output is zstd-compressed. Only the latest
+    input's output is kept per input name.
     todo: TTL and RDF also supported? not just OWL?"""
     # Vars
-    infile = os.path.basename(inpath)
-    cache_path = os.path.join(CACHE_DIR, infile + '.obographs.json')
-    outpath = os.path.join(out_dir, infile + '.obographs.json')
-    command = f'java -jar {ROBOT_PATH} convert -i {inpath} -o {outpath} --format json'
+    infile = Path(inpath).name
+    outpath = str(Path(out_dir, infile + '.obographs.json'))
+    robot_args = ['convert', '-i', inpath, '-o', outpath, '--format', 'json']
+    cache_path = Path(CACHE_DIR, f'{infile}.{_file_sha256(inpath)}.obographs.json.zst') \
+        if use_cache or cache_output else None
 
     # Convert
-    if not os.path.exists(out_dir):
-        os.makedirs(out_dir)
-    if use_cache and os.path.exists(cache_path):
-        return cache_path
+    os.makedirs(out_dir, exist_ok=True)
+    if use_cache and cache_path.exists():
+        with open(cache_path, 'rb') as f_in, open(outpath, 'wb') as f_out:
+            zstandard.ZstdDecompressor().copy_stream(f_in, f_out, write_size=1024 * 1024)
+        return outpath
     # todo: Switch back to `bioontologies` when complete: https://github.com/biopragmatics/bioontologies/issues/9
     # from bioontologies import robot
     # parse_results: robot.ParseResults = robot.convert_to_obograph_local(inpath)
     # graph = parse_results.graph_document.graphs[0]
-    _run_shell_command(command)
+    _run_robot(robot_args)
 
     if cache_output:
-        shutil.copy(outpath, cache_path)
+        tmp_path = str(cache_path) + '.tmp'
+        with open(outpath, 'rb') as f_in, open(tmp_path, 'wb') as f_out:
+            compressor = zstandard.ZstdCompressor(level=CACHE_ZSTD_LEVEL, threads=-1)
+            compressor.copy_stream(f_in, f_out, write_size=1024 * 1024)
+        os.replace(tmp_path, cache_path)
+        # Output for earlier versions of the input
+        stale_re = re.compile(re.escape(infile) + r'\.[0-9a-f]{64}\.obographs\.json\.zst')
+        for stale_path in Path(CACHE_DIR).iterdir():
+            if stale_re.fullmatch(stale_path.name) and stale_path != cache_path:
+                stale_path.unlink(missing_ok=True)
 
     return outpath
 
 
+def _stream_obograph_to_fhir(
+    inpath: str, out_path: str, code_system_id: str = None, code_system_url: str = None, include_all_predicates=True,
+    native_uri_stems: List[str] = None
+):
+    """Convert Obograph JSON to a FHIR CodeSystem, one node at a time
+    Gives the same CodeSystem as OboGraphToFHIRConverter.dump(), without loading the whole Obograph into memory. A first
+    pass indexes edges by subject. A second pass converts each node as it is read and writes its concept straight to
+    disk, using OAK's own per-node conversion. It writes to a temp file that replaces `out_path` once complete, so that
+    a failed conversion doesn't leave a truncated CodeSystem behind."""
+    converter = _fhir_converter()
+    converter.predicates_to_export = set()
+    edges_by_subject: Dict[str, List[Tuple[str, str]]] = {}
+    with open(inpath, 'rb') as f:
+        for edge in ijson.items(f, 'graphs.item.edges.item'):
+            edges_by_subject.setdefault(edge['sub'], []).append((edge['pred'], edge['obj']))
+
+    header = {'resourceType': CodeSystem.__name__}
+    if code_system_id:
+        header['id'] = code_system_id
+        if code_system_url:
+            header['url'] = code_system_url
+    scratch = CodeSystem()
+    tmp_path = out_path + '.tmp'
+    with open(inpath, 'rb') as f_in, open(tmp_path, 'w', encoding='UTF-8') as f_out:
+        f_out.write(json.dumps(header)[:-1])
+        n_concepts = 0
+        for node_dict in ijson.items(f_in, 'graphs.item.nodes.item', use_float=True):
+            node: Node = json_loader.load_any(node_dict, target_class=Node)
+            edges = [Edge(sub=node.id, pred=pred, obj=obj) for pred, obj in edges_by_subject.get(node.id, [])]
+            concept = converter._convert_node(
+                node, index={node.id: edges}, target=scratch, include_all_predicates=include_all_predicates,
+                native_uri_stems=native_uri_stems)
+            scratch.concept.clear()
+            f_out.write((',\n' if n_concepts else ', "concept": [\n') + json_dumper.dumps(concept, inject_type=False))
+            n_concepts += 1
+        # Like dump(), which leaves out empty lists
+        if n_concepts:
+            f_out.write('\n]')
+        if converter.predicates_to_export:
+            properties = [
+                json_dumper.dumps(CodeSystemProperty(code=x, uri=x, type='packages'), inject_type=False)
+                for x in sorted(converter.predicates_to_export)]
+            f_out.write(', "property": [' + ',\n'.join(properties) + ']')
+        f_out.write('}\n')
+    os.replace(tmp_path, out_path)
+
+
 # todo: This doesn't work until following Obographs issues solved. Moved to semsql intermediary for now.
 #  - https://github.com/linkml/linkml/issues/1156
 #  - https://github.com/ontodev/robot/issues/1079
@@ -143,54 +572,49 @@ def obograph_to_fhir(
     dev_oak_interpreter_path: str = None
 ) -> str:
     """Convert Obograph to FHIR"""
-    out_path = os.path.join(out_dir, out_filename)
-    if not os.path.exists(out_dir):
-        os.makedirs(out_dir)
-    local_dev_exists: bool = (os.path.exists(dev_oak_path) if dev_oak_path else False) and (
-        os.path.exists(dev_oak_interpreter_path) if dev_oak_interpreter_path else False)
-    native_uri_stems_str = '"' + ','.join(native_uri_stems) + '"' if native_uri_stems else None
+    out_path = str(Path(out_dir, out_filename))
+    os.makedirs(out_dir, exist_ok=True)
+    local_dev_exists: bool = all(_path and Path(_path).exists() for _path in (dev_oak_path, dev_oak_interpreter_path))
     if dev_oak_path and local_dev_exists:  # Params last updated: 2023/01/15
-        dev_oak_cli_path = os.path.join(dev_oak_path, 'src', 'oaklib', 'cli.py')
-        command_str = \
-            f'{dev_oak_interpreter_path} {dev_oak_cli_path} -i {inpath} dump -o {out_path} -O fhirjson' + \
-            ' --include-all-predicates' if include_all_predicates else '' + \
-            f' --code-system-id {code_system_id}' if code_system_id else '' + \
-            f' --code-system-url {code_system_url}' if code_system_url else '' + \
-            f' --native-uri-stems {native_uri_stems_str}' if native_uri_stems_str else ''
-        _run_shell_command(command_str)
+        dev_oak_cli_path = str(Path(dev_oak_path, 'src', 'oaklib', 'cli.py'))
+        command = [
+            dev_oak_interpreter_path, dev_oak_cli_path, '-i', str(inpath), 'dump', '-o', out_path, '-O', 'fhirjson']
+        if include_all_predicates:
+            command.append('--include-all-predicates')
+        if code_system_id:
+            command.extend(['--code-system-id', code_system_id])
+        if code_system_url:
+            command.extend(['--code-system-url', code_system_url])
+        if native_uri_stems:
+            command.extend(['--native-uri-stems', ','.join(native_uri_stems)])
+        _run_shell_command(command)
 
     elif dev_oak_path and not local_dev_exists:
         print('Warning: Tried to use local dev OAK, but one of paths does not exist. Using installed OAK release.')
     else:
-        converter = OboGraphToFHIRConverter()
-        converter.curie_converter = curies.Converter.from_prefix_map(get_default_prefix_map())
-        gd: GraphDocument = json_loader.load(str(inpath), target_class=GraphDocument)
-        converter.dump(
-            gd,
+        _stream_obograph_to_fhir(
+            str(inpath),
             out_path,
             code_system_id=code_system_id,
             code_system_url=code_system_url,
             include_all_predicates=include_all_predicates,
             native_uri_stems=native_uri_stems)
         # TODO: add these params once supported: use_curies_native_concepts, use_curies_foreign_concepts
-        # converter.dump(
-        #     gd, out_path, code_system_id='', code_system_url='', include_all_predicates=include_all_predicates,
-        #     native_uri_stems=native_uri_stems, use_curies_native_concepts=False, use_curies_foreign_concepts=True)
     return out_path
 
 
-# todo: add local dev oak params to this and abstract a general 'run oak' func for this and obographs_to_fhir
+# todo: add local dev oak params to this
 def semsql_to_fhir(inpath: str, out_dir: str, out_filename: str = None, include_all_predicates=False) -> str:
-    """Convert SemanticSQL sqlite DB to FHIR"""
-    # todo: any way to do this using Python API?
-    # todo: do I need some way of supplying prefix_map? check: are outputs all URIs?
-    # converter.curie_converter = curies.Converter.from_prefix_map(get_default_prefix_map())
-    out_path = os.path.join(out_dir, out_filename)
-    if not os.path.exists(out_dir):
-        os.makedirs(out_dir)
-    preds_flag = ' --include-all-predicates' if include_all_predicates else ''
-    command_str = f'runoak -i sqlite:{inpath} dump -o {out_path} -O fhirjson{preds_flag}'
-    _run_shell_command(command_str)
+    """Convert SemanticSQL sqlite DB to FHIR
+    Does in-process what `runoak -i sqlite:INPATH dump -O fhirjson` does, rather than paying interpreter startup and
+    OAK's imports in a subprocess."""
+    out_path = str(Path(out_dir, out_filename))
+    os.makedirs(out_dir, exist_ok=True)
+    oi = get_adapter(f'sqlite:{inpath}')
+    gd = GraphDocument(graphs=[oi.as_obograph()])
+    converter = OboGraphToFHIRConverter()
+    converter.curie_converter = oi.converter
+    converter.dump(gd, out_path, include_all_predicates=include_all_predicates)
     return out_path  # todo: When OAK changes to save multiple files, return out_dir
 
 
@@ -199,75 +623,129 @@ def owl_to_fhir(
     retain_intermediaries=False, intermediary_type=['obographs', 'semsql'][0], use_cached_intermediaries=False,
     intermediary_outdir: str = None, convert_intermediaries_only=False, native_uri_stems: List[str] = None,
     code_system_id: str = None, code_system_url: str = None, dev_oak_path: str = None,
-    dev_oak_interpreter_path: str = None, rxnorm_bioportal=False
+    dev_oak_interpreter_path: str = None, rxnorm_bioportal=False, keep_odk_container=False, insecure=False
 ) -> str:
     """Run conversion
 
-    :param rxnorm_bioportal: Special custom case. Set True if the file being processed is RxNorm.ttl from BioPortal."""
-    include_all_predicates = not include_only_critical_predicates
-
-    if not os.path.exists(CACHE_DIR):
-        os.makedirs(CACHE_DIR)
-
-    # Download if necessary & determine outpaths
-    # todo: this section w/ urls, names, and IDs has too many possible branches and is error prone. simplify by
-    #  updating CLI params to require url or path separately, and maybe require codesystem id
-    input_path_or_url = str(input_path_or_url)
-    input_path = input_path_or_url
-    url = None
-    maybe_url = urlparse(input_path_or_url)
-    out_dir = out_dir if out_dir else os.getcwd()
-    if out_dir.startswith('~'):
-        out_dir = os.path.expanduser('~/Desktop')
-    if maybe_url.scheme and maybe_url.netloc:
-        url = input_path_or_url
-    if url:
-        download_path = os.path.join(out_dir, out_filename.replace('.json', '.owl'))
-        input_path = download_path
-        download(url, download_path, use_cached_intermediaries)
-    if not out_filename:
-        if not code_system_id:
-            code_system_id = '.'.join(os.path.basename(input_path).split('.')[0:-1])  # removes file extension
-        out_filename = f'CodeSystem-{code_system_id}.json'
-    if not code_system_id and out_filename and out_filename.startswith('CodeSystem-'):
-        code_system_id = out_filename.split('-')[1].split('.')[0]
-    out_dir = os.path.realpath(out_dir if out_dir else os.path.dirname(input_path))
-    intermediary_outdir = intermediary_outdir if intermediary_outdir else out_dir
+    :param rxnorm_bioportal: Special custom case. Set True if the file being processed is RxNorm.ttl from BioPortal.
+    :param keep_odk_container: Only used for semsql intermediaries. If True, leave the ODK container running on exit so
+     that later runs can reuse it.
+    :param insecure: If True, don't verify TLS certificates when downloading `input_path_or_url`."""
+    config = Config(**locals())
+    _ensure_cache_dirs(config.out_dir, config.intermediary_outdir)
+
+    use_obographs = config.intermediary_type == 'obographs' or config.input_path.endswith('.ttl')  # semsql: .owl only
+
+    # Download if necessary, meanwhile getting the converter for the intermediary ready
+    if config.url:
+        warm_up = threading.Thread(target=_warm_robot if use_obographs else _pull_odk_image, daemon=True)
+        warm_up.start()
+        download(config.url, config.input_path, config.use_cached_intermediaries, insecure=config.insecure)
+        warm_up.join()
+    input_path = config.input_path
 
     # Preprocessing: Special cases
-    if rxnorm_bioportal:
+    if config.rxnorm_bioportal:
         input_path = _preprocess_rxnorm(input_path)
 
     # Convert
-    if intermediary_type == 'obographs' or input_path.endswith('.ttl'):  # semsql only supports .owl
-        intermediary_path = owl_to_obograph(input_path, out_dir, use_cached_intermediaries, use_cached_intermediaries)
+    if use_obographs:
+        intermediary_path = owl_to_obograph(
+            input_path, config.out_dir, config.use_cached_intermediaries, config.use_cached_intermediaries)
         obograph_to_fhir(
-            inpath=intermediary_path, out_dir=intermediary_outdir, out_filename=out_filename,
-            code_system_id=code_system_id, code_system_url=code_system_url, native_uri_stems=native_uri_stems,
-            include_all_predicates=include_all_predicates, dev_oak_path=dev_oak_path,
-            dev_oak_interpreter_path=dev_oak_interpreter_path)
+            inpath=intermediary_path, out_dir=config.intermediary_outdir, out_filename=config.out_filename,
+            code_system_id=config.code_system_id, code_system_url=config.code_system_url,
+            native_uri_stems=config.native_uri_stems, include_all_predicates=config.include_all_predicates,
+            dev_oak_path=config.dev_oak_path, dev_oak_interpreter_path=config.dev_oak_interpreter_path)
     else:  # semsql
         # todo: owl_to_semsql: this may need similar updates to caching that were done for obographs on 2023/04/15
-        intermediary_path = owl_to_semsql(input_path, use_cached_intermediaries)
+        intermediary_path = owl_to_semsql(input_path, config.use_cached_intermediaries, config.keep_odk_container)
         semsql_to_fhir(
-            inpath=intermediary_path, out_dir=intermediary_outdir, out_filename=out_filename,
-            include_all_predicates=include_all_predicates)
-    if convert_intermediaries_only:
+            inpath=intermediary_path, out_dir=config.intermediary_outdir, out_filename=config.out_filename,
+            include_all_predicates=config.include_all_predicates)
+    if config.convert_intermediaries_only:
         return intermediary_path
 
     # Cleanup
-    indir = os.path.dirname(input_path)
-    template_db_path = os.path.join(indir, '.template.db')
-    if os.path.exists(template_db_path):
-        os.remove(template_db_path)
-    if not retain_intermediaries:
-        # noinspection PyUnboundLocalVariable
+    if not _IN_BATCH_WORKER:  # Other jobs may share it. See: owl_to_fhir_batch()
+        (Path(input_path).parent / '.template.db').unlink(missing_ok=True)
+    if not config.retain_intermediaries:
         os.remove(intermediary_path)
-        if intermediary_type == 'semsql':
+        if config.intermediary_type == 'semsql':
             # More semsql intermediaries
-            intermediary_filename = os.path.basename(intermediary_path)
-            os.remove(os.path.join(indir, intermediary_filename.replace('.db', '-relation-graph.tsv.gz')))
-    return os.path.join(out_dir, out_filename)
+            db_path = Path(intermediary_path)
+            os.remove(db_path.with_name(db_path.stem + '-relation-graph.tsv.gz'))
+    return str(Path(config.out_dir, config.out_filename))
+
+
+def _init_batch_worker(odk_run_id: str, concurrent_jobs: int):
+    """Set up an owl_to_fhir_batch() worker process
+    Workers share the parent's run ID, so that the parent can remove the ODK containers they start, and size ROBOT's
+    heap to their share of memory. They leave removal of files that jobs share to the parent."""
+    global _ODK_RUN_ID, _CONCURRENT_JOBS, _IN_BATCH_WORKER
+    _ODK_RUN_ID = odk_run_id
+    _CONCURRENT_JOBS = concurrent_jobs
+    _IN_BATCH_WORKER = True
+
+
+def owl_to_fhir_batch(jobs: List[Dict], max_workers: int = None, **kwargs) -> List[Union[str, None]]:
+    """Convert several ontologies concurrently, each in its own process
+    A failed conversion doesn't stop the others. Each failure is printed as it happens, and all are summarized at the
+    end. SemSQL jobs whose inputs share a dir, e.g. URLs all downloaded to out_dir, share a .template.db there. It is
+    removed once all jobs are done, rather than by each job.
+
+    :param jobs: owl_to_fhir() params for each ontology, e.g. from _read_manifest().
+    :param max_workers: Max number of conversions to run at once. Defaults to the number of CPUs.
+    :param kwargs: owl_to_fhir() params shared by all jobs. Params in a job take precedence.
+    :return: Paths of the outputs, in the same order as `jobs`. None for each conversion that failed."""
+    jobs = [{**kwargs, **job} for job in jobs]
+    labels = [job.get('code_system_id') or str(job.get('input_path_or_url')) for job in jobs]
+    outputs: List[Union[str, None]] = [None] * len(jobs)
+    fails = []
+    concurrent_jobs = max(1, min(len(jobs), max_workers or os.cpu_count() or 1))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_batch_worker, initargs=(_ODK_RUN_ID, concurrent_jobs)
+        ) as executor:
+            futures = {executor.submit(owl_to_fhir, **job): i for i, job in enumerate(jobs)}
+            for n_done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    outputs[i] = future.result()
+                    print('Converted {} of {}: {}'.format(n_done, len(jobs), labels[i]))
+                except Exception as e:
+                    fails.append(labels[i])
+                    print('Failed to convert {}: \n{}'.format(labels[i], e))
+    finally:
+        semsql_jobs = [job for job in jobs if job.get('intermediary_type') == 'semsql']
+        if semsql_jobs:
+            _remove_odk_containers()  # Workers started these, but their exit handlers don't run
+        for job in semsql_jobs:
+            if job.get('convert_intermediaries_only'):
+                continue
+            try:
+                input_dir = Path(Config(**job).input_path).parent
+            except ValueError:  # Failed the same way in its worker
+                continue
+            (input_dir / '.template.db').unlink(missing_ok=True)
+    print('SUMMARY')
+    print('Successes: ' + str([label for label, output in zip(labels, outputs) if output]))
+    print('Failures: ' + str(fails))
+    return outputs
+
+
+def _read_manifest(path: str) -> List[Dict]:
+    """Read a manifest of ontologies to convert
+    Either a JSON list of objects, or a TSV with a header row. Keys / columns are MANIFEST_FIELDS. In a TSV,
+    native_uri_stems is comma-separated."""
+    with open(path, 'r') as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        jobs = [{k: v for k, v in row.items() if v} for row in csv.DictReader(f, delimiter='\t')]
+    for job in jobs:
+        if 'native_uri_stems' in job:
+            job['native_uri_stems'] = job['native_uri_stems'].split(',')
+    return jobs
 
 
 # TODO: some of these args said"for fhirjson only". Was this because I was going to add an option for NPM output when
@@ -275,17 +753,17 @@ def owl_to_fhir(
 def cli():
     """Command line interface."""
     parser = ArgumentParser(prog='OWL on FHIR', description='Python-based non-minimalistic OWL to FHIR converter.')
-    parser.add_argument('-i', '--input-path-or-url', required=True, help='URL or path to OWL file to convert.')
+    parser.add_argument('-i', '--input-path-or-url', required=False, help='URL or path to OWL file to convert.')
     parser.add_argument(
-        '-s', '--code-system-id', required=True, default=False,
+        '-s', '--code-system-id', required=False, default=False,
         help="The code system ID to use for identification on the server uploaded to. "
              "See: https://hl7.org/fhir/resource-definitions.html#Resource.id")
     parser.add_argument(
-        '-S', '--code-system-url', required=True, default=False,
+        '-S', '--code-system-url', required=False, default=False,
         help="Canonical URL for the code system. "
              "See: https://hl7.org/fhir/codesystem-definitions.html#CodeSystem.url")
     parser.add_argument(
-        '-u', '--native-uri-stems', required=True, nargs='+',
+        '-u', '--native-uri-stems', required=False, nargs='+',
         help='A comma-separated list of URI stems that will be used to determine whether a concept is native to '
              'the CodeSystem. For example, for OMIM, the following URI stems are native: '
              'https://omim.org/entry/,https://omim.org/phenotypicSeries/PS". '
@@ -293,11 +771,20 @@ def cli():
              ' being converted. This converter adds back the nodes, but to know which ones belong to the CodeSystem '
              'itself and are not foreign concepts, this parameter is necessary. OAK also makes use of this parameter. '
              'See also: https://github.com/geneontology/obographs/issues/90')
+    parser.add_argument(
+        '-M', '--manifest', required=False,
+        help='Path to a JSON or TSV file listing several ontologies to convert, which are then converted in parallel. '
+             'Each entry has: input_path_or_url, code_system_id, code_system_url, and native_uri_stems '
+             '(comma-separated in a TSV). Replaces --input-path-or-url, --code-system-id, --code-system-url, and '
+             '--native-uri-stems; the other options apply to every entry, except --out-filename, which can\'t be used '
+             'with --manifest.')
     parser.add_argument(
         '-o', '--out-dir', required=False, default=os.getcwd(),
         help='Output directory. Defaults to current working directory.')
     parser.add_argument(
-        '-n', '--out-filename', required=False, help='Filename for the primary file converted, e.g. CodeSystem.')
+        '-n', '--out-filename', required=False,
+        help='Filename for the primary file converted, e.g. CodeSystem. Defaults to CodeSystem-<code system ID>.json. '
+             'Not usable with --manifest.')
     parser.add_argument(
         '-p', '--include-only-critical-predicates', action='store_true', required=False, default=False,
         help='If present, includes only critical predicates (is_a/parent) rather than all predicates in '
@@ -315,6 +802,13 @@ def cli():
     parser.add_argument(
         '-I', '--convert-intermediaries-only', action='store_true', default=False, required=False,
         help='Convert intermediaries only?')
+    parser.add_argument(
+        '-k', '--keep-odk-container', action='store_true', default=False, required=False,
+        help='For the semsql intermediary: leave the ODK docker container running when done, so that subsequent runs '
+             'can reuse it rather than starting a new one.')
+    parser.add_argument(
+        '--insecure', action='store_true', default=False, required=False,
+        help='If --input-path-or-url is a URL, download it without verifying the server\'s TLS certificate.')
     parser.add_argument(
         '-d', '--dev-oak-path', default=False, required=False,
         help='If you want to use a local development version of OAK, specify the path to the OAK directory here. '
@@ -325,6 +819,19 @@ def cli():
              'its dependencies are installed (i.e. its virtual environment). Must be used with --dev-oak-path.')
 
     d: Dict = vars(parser.parse_args())
+    manifest = d.pop('manifest')
+    if manifest:
+        if d['out_filename']:
+            parser.error(
+                '--out-filename can\'t be used with --manifest: each entry\'s is named after its code_system_id')
+        outputs = owl_to_fhir_batch(
+            _read_manifest(manifest), **{k: v for k, v in d.items() if k not in MANIFEST_FIELDS})
+        if None in outputs:
+            parser.exit(1)
+        return
+    missing = ['--' + x.replace('_', '-') for x in MANIFEST_FIELDS if not d[x]]
+    if missing:
+        parser.error('the following arguments are required unless using --manifest: ' + ', '.join(missing))
     owl_to_fhir(**d)
 
 
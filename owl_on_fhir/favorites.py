@@ -4,7 +4,7 @@ from argparse import ArgumentParser
 from collections import OrderedDict
 from typing import Dict
 
-from owl_on_fhir.__main__ import PROJECT_DIR, owl_to_fhir
+from owl_on_fhir.__main__ import PROJECT_DIR, owl_to_fhir_batch
 
 
 # Vars
@@ -73,26 +73,20 @@ def _run_favorites(
     convert_intermediaries_only: bool = None, dev_oak_path: str = None, dev_oak_interpreter_path: str = None,
     favorites: Dict = FAVORITE_ONTOLOGIES
 ):
-    """Convert favorite ontologies"""
+    """Convert favorite ontologies
+    The ontologies are independent of each other, so they are converted concurrently, one process each. See:
+    owl_to_fhir_batch()"""
     kwargs = {k: v for k, v in locals().items() if v is not None and not k.startswith('__') and k != 'favorites'}
-    fails = []
-    successes = []
-    n = len(favorites)
-    i = 0
-    for d in favorites.values():
-        i += 1
-        print('Converting {} of {}: {}'.format(i, n, d['code_system_id']))
-        try:
-            owl_to_fhir(
-                out_filename=f'CodeSystem-{d["code_system_id"]}.json',
-                input_path_or_url=d['input_path'] if d['input_path'] else d['download_url'], **kwargs)
-            successes.append(d['id'])
-        except Exception as e:
-            fails.append(d['code_system_id'])
-            print('Failed to convert {}: \n{}'.format(d['code_system_id'], e))
-    print('SUMMARY')
-    print('Successes: ' + str(successes))
-    print('Failures: ' + str(fails))
+    if 'include_all_predicates' in kwargs:  # owl_to_fhir() takes the inverse
+        kwargs['include_only_critical_predicates'] = not kwargs.pop('include_all_predicates')
+    jobs = [{
+        'out_filename': f'CodeSystem-{d["code_system_id"]}.json',
+        'input_path_or_url': d['input_path'] if d['input_path'] else d['download_url'],
+        'code_system_id': d['code_system_id'],
+        'code_system_url': d['code_system_url'],
+        'native_uri_stems': d['native_uri_stems'],
+    } for d in favorites.values()]
+    owl_to_fhir_batch(jobs, max_workers=min(len(jobs), os.cpu_count() or 1), **kwargs)
 
 
 def favs_cli():
@@ -20,9 +20,16 @@ VERSION = '1.0.1'
 # Requirements
 REQUIRED = [
     'bioontologies',
-    'oaklib>=0.5.1',
+    'ijson',
+    # Capped: the CodeSystem writer uses OboGraphToFHIRConverter._convert_node(), which is private to OAK
+    'oaklib>=0.5.1,<0.6',
     'requests>2.28.2',
+    'zstandard',
 ]
+EXTRAS = {
+    # Keeps one warm JVM for ROBOT instead of running `java -jar robot.jar` per conversion
+    'jpype': ['JPype1'],
+}
 
 # Description
 with io.open(os.path.join(PROJECT_ROOT, 'README.md'), encoding='utf-8') as f:
@@ -79,11 +86,10 @@ setup(
     package_data={
         'owl_on_fhir': [
             'owl_on_fhir/robot.jar',
-            'owl_on_fhir/convert_owl_ncbo2owl.pl',
         ]
     },
     install_requires=REQUIRED,
-    # extras_require=EXTRAS,
+    extras_require=EXTRAS,
     include_package_data=True,
     # license='MIT',  # todo: add LICENSE.md from GitHub and add license
     classifiers=[